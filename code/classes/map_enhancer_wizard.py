@@ -7,7 +7,10 @@ import cv2
 import numpy as np
 import yaml
 import os
-from collections import deque
+import math
+import queue
+import threading
+from collections import deque, namedtuple, OrderedDict
 from classes.tooltip import ToolTip
 from classes.optimizer import Optimizer
 from utils.clamp import clamp
@@ -15,10 +18,43 @@ from utils.safe_float import safe_float
 from utils.cv_to_photo import cv_to_photo
 from utils.linux_mousewheel_bind import linux_mousewheel_bind
 from utils.morphological_kernel import morphological_kernel
+from utils.otsu_threshold import otsu_threshold
+from utils.laplacian_variance import laplacian_variance
+from utils.load_map_files import load_map_files
 
 # Application title constant
 APP_TITLE = "Map Enhancer Wizard (V2)"
 
+# Undo/redo snapshot of the filter parameters (a tuple: cheap to build and compare)
+FilterState = namedtuple("FilterState", "threshold adaptive blur median opening closing dilation erosion")
+
+# Maximum number of undo (and redo) steps kept
+HISTORY_SIZE = 64
+
+# Number of intermediate filter results kept for incremental re-filtering
+STAGE_CACHE_SIZE = 8
+
+# Delay (ms) used to coalesce slider drag events before re-filtering
+SCALE_DEBOUNCE_MS = 40
+
+# Largest preview width/height (px) ever composed
+MAX_PREVIEW_DIM = 10000
+
+# Smallest side kept when halving a map for the zoomed-out preview pyramid
+PYRAMID_MIN_SIDE = 128
+
+# Frame interval (ms) used to coalesce wheel/resize redraw bursts
+PREVIEW_FRAME_MS = 16
+
+# Interval (ms) at which the UI polls a background map load for its result
+LOAD_POLL_MS = 30
+
+# Maps with at least this many pixels are filtered on a worker thread during live preview
+ASYNC_FILTER_MIN_PX = 4_000_000
+
+# libyaml-backed dumper for saving metadata when PyYAML was built with it, pure-Python otherwise
+YAML_DUMPER = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
 class MapEnhancerWizard(tk.Tk):
     def __init__(self):
         # Initialize Tkinter root window
@@ -27,7 +63,8 @@ class MapEnhancerWizard(tk.Tk):
         self.geometry("1400x900")  # Default window size
         self.minsize(1000, 700)   # Minimum window size
 
-        # Map state variables
+        # Map state variables. Maps are replaced, never written in place, and are published
+        # read-only: identity-keyed caches stay valid and maps can be shared without copies.
         self.original_map = None          # Original loaded PGM image
         self.filter_input_map = None      # Base image for filtering
         self.processed_map = None         # Latest filtered/optimized map
@@ -40,7 +77,15 @@ class MapEnhancerWizard(tk.Tk):
         self.pan_y = 0                    # Vertical pan offset
         self.pan_start = None             # Starting point for panning
         self.photo_cache = None           # Cached PhotoImage for canvas
+        self._photo_shape = None          # Array shape photo_cache was created for
+        self._photo_key = None            # (composition generation, overlay state) last uploaded into photo_cache
+        self._overlay_buf = None          # Reused RGB buffer the control-point overlay is drawn into
+        self._metrics_src = None          # Image the status-bar metrics were computed from
+        self._pyramids = []               # [(source, [full, 1/2, 1/4, ...])] for zoomed-out previews
+        self._image_item = None           # Persistent canvas image item for the preview
         self.last_draw = {"scale": 1.0, "ox": 0, "oy": 0}  # Canvas drawing parameters
+        self._composed_cache = {"key": None, "srcs": (), "img": None, "gen": 0}  # Last composed preview image
+        self._update_affines()            # Image<->canvas transforms baked from last_draw and pan
 
         # UI state variables
         self.preview_mode = tk.StringVar(value="enhanced")  # Preview mode: "original", "enhanced", "side_by_side"
@@ -52,6 +97,7 @@ class MapEnhancerWizard(tk.Tk):
         # Filter parameters
         self.threshold_var = tk.DoubleVar(value=0.5)       # Threshold (0..1 mapped to 0..255)
         self.use_adaptive = tk.BooleanVar(value=False)     # Use adaptive thresholding
+        self.use_opencl = tk.BooleanVar(value=False)       # Run the filter chain through OpenCL (T-API)
         self.blur_var = tk.IntVar(value=0)                # Gaussian blur kernel size
         self.median_var = tk.IntVar(value=0)              # Median filter kernel size
         self.opening_var = tk.IntVar(value=0)             # Opening morphology size
@@ -64,8 +110,27 @@ class MapEnhancerWizard(tk.Tk):
         self.zoom_label_var = tk.StringVar(value="100%")   # Displays current zoom level
 
         # Undo/redo history
-        self.history = deque(maxlen=50)                   # Past filter states
-        self.future = deque(maxlen=50)                    # Redo stack
+        self.history = deque(maxlen=HISTORY_SIZE)         # Past filter states
+        self.future = deque(maxlen=HISTORY_SIZE)          # Redo stack
+
+        # Slider debounce state
+        self._scale_after_id = None                       # Pending after() job for slider changes
+        self._pending_scale_cb = None                     # Callback to run when the job fires
+        self._clamping_scale = False                      # Guards the trace against its own clamp write
+        self._restoring = False                           # Set while sliders are written programmatically (undo, reset, auto)
+        self._scale_values = {}                           # Last value seen per slider variable name
+        self._preview_after_id = None                     # Pending after() job for a coalesced redraw
+
+        # Background map loading
+        self._load_thread = None                          # Worker reading PGM/YAML off the Tk thread
+        self._load_queue = queue.Queue()                  # Worker -> UI result hand-off
+
+        # Incremental filter pipeline: stage outputs keyed by the chain of stages producing them
+        self._stage_cache = OrderedDict()                 # LRU of {(stage, ...): image}
+        self._stage_cache_src = None                      # Input image the cache was built from
+        self._stage_cache_gen = 0                         # Bumped on every invalidation; stale filter jobs are dropped
+        self._filter_thread = None                        # Worker running uncached stages of a large map
+        self._filter_queue = queue.Queue()                # Worker -> UI filter results
 
         # Optimizer instance for control point management
         self.optimizer = Optimizer(self)
@@ -144,8 +209,6 @@ class MapEnhancerWizard(tk.Tk):
         self.canvas.bind("<B2-Motion>", self._on_pan_drag)       # Middle-drag to pan
         linux_mousewheel_bind(self.canvas, self._on_wheel)       # Mouse wheel for zooming
         self.canvas.bind("<Shift-Double-Button-1>", lambda e: self.fit_to_window())  # Shift+double-click to fit
-        self.canvas.bind("<ButtonPress-1>", self._on_canvas_click)  # Left-click for control points
-        self.canvas.bind("<Double-Button-1>", self._on_canvas_double_click)  # Double-click to remove connections
 
     def _build_left_scrollable(self, parent):
         # Create a scrollable container for left-side controls
@@ -223,9 +286,8 @@ class MapEnhancerWizard(tk.Tk):
             ttk.Label(row, text=text).pack(side="left")
             val_lbl = ttk.Label(row, textvariable=tk.StringVar(value=str(var.get())), width=6, anchor="e")
             val_lbl.pack(side="right")
-            scale = ttk.Scale(row, from_=from_, to=to_, orient="horizontal",
-                              command=lambda _=None, v=var, l=val_lbl: self._on_scale_change(v, l, cb),
-                              variable=var)
+            scale = ttk.Scale(row, from_=from_, to=to_, orient="horizontal", variable=var)
+            var.trace_add("write", lambda *_, v=var, l=val_lbl: self._on_scale_change(v, l, cb))  # One event per change
             scale.pack(fill="x", padx=8)
             if tooltip:
                 ToolTip(scale, tooltip)
@@ -247,6 +309,11 @@ class MapEnhancerWizard(tk.Tk):
                    tooltip="Thicken obstacles or close narrow gaps.")
         add_slider(filt, "Erosion (px)", self.erosion_var, 0, 15, 1, cb=self.update_preview,
                    tooltip="Thin obstacles / remove edge artifacts.")
+        ocl = ttk.Checkbutton(filt, text="Use GPU (OpenCL) for filters", variable=self.use_opencl, command=self._on_opencl_toggle)
+        ocl.pack(anchor="w", pady=(6, 0))
+        if not cv2.ocl.haveOpenCL():
+            ocl.state(["disabled"])
+        ToolTip(ocl, "Offload blur/threshold/morphology to an OpenCL device. Mostly helps on large maps.")
 
         # Action buttons
         act = ttk.Labelframe(parent, text="Actions", padding=10, style="Card.TLabelframe")
@@ -267,7 +334,7 @@ class MapEnhancerWizard(tk.Tk):
                 self.paned.sash_place(0, left_w, 1)
         except Exception:
             pass
-        self.update_preview()
+        self._schedule_preview()  # <Configure> fires for every child widget: coalesce the burst
 
     def _bind_keys(self):
         # Bind keyboard shortcuts for common actions
@@ -282,43 +349,105 @@ class MapEnhancerWizard(tk.Tk):
         self.bind("<Escape>", lambda e: self._center_preview())
 
     def _on_scale_change(self, var, label_widget, callback):
-        # Update slider value, clamp it, and refresh label
-        if isinstance(var, tk.IntVar):
-            var.set(clamp(var.get(), 0, 9999))
-        elif isinstance(var, tk.DoubleVar):
-            var.set(clamp(var.get(), 0.0, 1.0))
-        label_widget.configure(text=str(var.get()))
+        # Update slider value, clamp it, and refresh label (runs from the variable's write trace)
+        if self._clamping_scale:
+            return  # Write-back from the clamp below
+        self._clamping_scale = True
+        try:
+            if isinstance(var, tk.IntVar):
+                var.set(clamp(var.get(), 0, 9999))
+            elif isinstance(var, tk.DoubleVar):
+                var.set(clamp(var.get(), 0.0, 1.0))
+        finally:
+            self._clamping_scale = False
+        value = var.get()
+        if self._scale_values.get(str(var)) == value:
+            return  # Drag within the same step: nothing to refilter
+        self._scale_values[str(var)] = value
+        label_widget.configure(text=str(value))
+        if self._restoring:
+            return  # The caller records history and refreshes the preview itself
+        # Defer history and the filter pipeline until the drag settles
+        self._pending_scale_cb = callback
+        if self._scale_after_id is not None:
+            self.after_cancel(self._scale_after_id)
+        self._scale_after_id = self.after(SCALE_DEBOUNCE_MS, self._flush_scale_change)
+
+    def _flush_scale_change(self):
+        # Commit the last slider value: snapshot history and run the callback once
+        self._scale_after_id = None
+        callback, self._pending_scale_cb = self._pending_scale_cb, None
         self._push_history_snapshot()
         if callback:
             callback()
 
+    def _on_opencl_toggle(self):
+        # Switch OpenCV's OpenCL usage and recompute filters on the selected backend
+        cv2.ocl.setUseOpenCL(bool(self.use_opencl.get()))
+        self._invalidate_stage_cache()
+        self.update_preview()
+
     def select_folder(self):
         # Load a folder containing .pgm and .yaml files
+        if self._load_thread is not None and self._load_thread.is_alive():
+            self._status("Still loading the previous map…")
+            return
         folder = filedialog.askdirectory(title="Select folder containing .pgm and .yaml")
         if not folder:
             return
         try:
             pgm_file = next((os.path.join(folder, f) for f in os.listdir(folder) if f.lower().endswith(".pgm")), None)
             yaml_file = next((os.path.join(folder, f) for f in os.listdir(folder) if f.lower().endswith(".yaml")), None)
-            if not pgm_file or not yaml_file:
-                messagebox.showerror("Error", "Missing .pgm or .yaml in selected folder.")
-                return
-            with open(yaml_file, "r") as fd:
-                meta = yaml.safe_load(fd) or {}
-                if not isinstance(meta, dict):
-                    meta = {}
-                self.map_metadata = meta
-            img = cv2.imread(pgm_file, cv2.IMREAD_GRAYSCALE)
-            if img is None or img.size == 0:
-                messagebox.showerror("Error", "Failed to load PGM image.")
-                return
+        except Exception as ex:
+            messagebox.showerror("Error", f"Failed to load folder:\n{ex}")
+            return
+        if not pgm_file or not yaml_file:
+            messagebox.showerror("Error", "Missing .pgm or .yaml in selected folder.")
+            return
+        self._status(f"Loading: {os.path.basename(folder)}…")
+        self._load_thread = threading.Thread(target=self._load_worker, args=(folder, pgm_file, yaml_file), daemon=True)
+        self._load_thread.start()
+        self.after(LOAD_POLL_MS, self._poll_load)
+
+    def _load_worker(self, folder, pgm_file, yaml_file):
+        # Background thread: read files only, never touch Tk; hand the result to the UI via the queue
+        try:
+            img, meta = load_map_files(pgm_file, yaml_file)
+            self._load_queue.put((folder, pgm_file, yaml_file, img, meta, None))
+        except Exception as ex:
+            self._load_queue.put((folder, pgm_file, yaml_file, None, None, ex))
+
+    def _poll_load(self):
+        # Wait for the background load without blocking the Tk event loop
+        try:
+            result = self._load_queue.get_nowait()
+        except queue.Empty:
+            self.after(LOAD_POLL_MS, self._poll_load)
+            return
+        self._finish_load(*result)
+
+    def _finish_load(self, folder, pgm_file, yaml_file, img, meta, error):
+        # Install a freshly loaded map (runs on the Tk thread)
+        if error is not None:
+            self._status("Load failed")
+            messagebox.showerror("Error", f"Failed to load folder:\n{error}")
+            return
+        if img is None or img.size == 0:
+            self._status("Load failed")
+            messagebox.showerror("Error", "Failed to load PGM image.")
+            return
+        try:
+            self.map_metadata = meta
+            img.setflags(write=False)
             self.original_map = img
-            self.filter_input_map = img.copy()
-            self.processed_map = img.copy()
+            self.filter_input_map = img
+            self.processed_map = img
             self.original_folder_name = os.path.basename(folder)
             self.zoom_factor = 1.0
             self.pan_x = 0
             self.pan_y = 0
+            self._invalidate_stage_cache()
+            self._invalidate_composed_cache()
             self._update_meta_text(pgm_file, yaml_file)
             self._clear_history()
             self._push_history_snapshot()
@@ -329,6 +458,7 @@ class MapEnhancerWizard(tk.Tk):
 
     def save_map(self):
         # Save the processed map and updated metadata
+        self._settle_filters()
         if self.processed_map is None:
             messagebox.showerror("Error", "No map to save.")
             return
@@ -340,14 +470,14 @@ class MapEnhancerWizard(tk.Tk):
             pgm_file = os.path.join(save_folder, f"{folder_name}.pgm")
             yaml_file = os.path.join(save_folder, f"{folder_name}.yaml")
             if self.optimizer.working_map is not None:
-                self.processed_map = self.optimizer.working_map.copy()
+                self.processed_map = self.optimizer.working_map
             ok = cv2.imwrite(pgm_file, self.processed_map)
             if not ok:
                 raise RuntimeError("cv2.imwrite failed")
             meta = dict(self.map_metadata) if isinstance(self.map_metadata, dict) else {}
             meta["image"] = f"{folder_name}.pgm"
             with open(yaml_file, "w") as fd:
-                yaml.safe_dump(meta, fd, default_flow_style=False, sort_keys=False)
+                yaml.dump(meta, fd, Dumper=YAML_DUMPER, default_flow_style=False, sort_keys=False)
             self._status(f"Saved to: {save_folder}")
             messagebox.showinfo("Success", f"Map saved:\n{pgm_file}\n{yaml_file}")
         except Exception as ex:
@@ -377,40 +507,151 @@ class MapEnhancerWizard(tk.Tk):
         self.meta_text.insert("1.0", "\n".join(lines))
 
     def apply_filters(self):
-        # Apply image processing filters based on UI parameters
+        # Apply image processing filters based on UI parameters, reusing cached stage outputs
         base = self.filter_input_map if self.filter_input_map is not None else self.original_map
         if base is None:
             return None
-        img = base.copy()
-        med = clamp(int(self.median_var.get()), 0, 99)
-        if med > 0:
-            k = med if med % 2 == 1 else med + 1
-            img = cv2.medianBlur(img, k)  # Remove salt-and-pepper noise
-        g = clamp(int(self.blur_var.get()), 0, 99)
-        if g > 0:
-            k = g if g % 2 == 1 else g + 1
-            img = cv2.GaussianBlur(img, (k, k), 0)  # Smooth image
+        plan, done, out = self._cached_filter_prefix(base)
+        if done < len(plan):
+            outs = self._run_filter_stages(out, plan[done:], bool(self.use_opencl.get()))
+            self._store_filter_stages(plan, done, outs)
+            out = outs[-1]
+        self.processed_map = out
+        return out
+
+    def _apply_filters_async(self):
+        # Like apply_filters, but large maps run their uncached stages on a worker thread
+        base = self.filter_input_map if self.filter_input_map is not None else self.original_map
+        if base is None or base.size < ASYNC_FILTER_MIN_PX:
+            self.apply_filters()
+            return
+        plan, done, out = self._cached_filter_prefix(base)
+        if done == len(plan):
+            self.processed_map = out
+            return
+        if self._filter_thread is None:  # One job at a time; its poll restarts with the newest sliders
+            self._filter_thread = threading.Thread(target=self._filter_worker, daemon=True,
+                                                   args=(self._stage_cache_gen, plan, done, out, bool(self.use_opencl.get())))
+            self._filter_thread.start()
+            self.after(LOAD_POLL_MS, self._poll_filters)
+
+    def _filter_worker(self, gen, plan, done, img, use_opencl):
+        # Background thread: run the uncached stages only, never touch Tk or the stage cache
+        try:
+            self._filter_queue.put((gen, plan, done, self._run_filter_stages(img, plan[done:], use_opencl), None))
+        except Exception as ex:
+            self._filter_queue.put((gen, plan, done, None, ex))
+
+    def _poll_filters(self):
+        # Install a finished filter job (Tk thread) and redraw
+        try:
+            gen, plan, done, outs, error = self._filter_queue.get_nowait()
+        except queue.Empty:
+            self.after(LOAD_POLL_MS, self._poll_filters)
+            return
+        self._filter_thread = None
+        if error is not None:
+            self.apply_filters()  # Rerun here so the failure surfaces like any other Tk callback error
+        elif gen == self._stage_cache_gen:  # Otherwise the cache was invalidated meanwhile (new map or backend): drop it
+            self._store_filter_stages(plan, done, outs)
+        self.update_preview()
+
+    def _settle_filters(self):
+        # Bring processed_map up to date now if a filter job is still running
+        if self._filter_thread is not None and self.active_tab == "Filtering":
+            self.apply_filters()
+
+    def _cached_filter_prefix(self, base):
+        # Current plan, number of leading stages served by the cache, and the image they produce
+        if self._stage_cache_src is not base:
+            self._invalidate_stage_cache()
+            self._stage_cache_src = base
+        plan = self._filter_plan(base)
+        for done in range(len(plan), 0, -1):  # Longest cached prefix wins
+            key = tuple(plan[:done])  # Key covers every stage up to and including the last one
+            if key in self._stage_cache:
+                for i in range(1, done + 1):
+                    if tuple(plan[:i]) in self._stage_cache:
+                        self._stage_cache.move_to_end(tuple(plan[:i]))  # Mark the used chain as recent
+                return plan, done, self._stage_cache[key]
+        return plan, 0, base
+
+    def _run_filter_stages(self, img, stages, use_opencl):
+        # Run stages in order and return every intermediate output (no UI or cache access: thread-safe)
+        outs = []
+        gpu = cv2.UMat(img) if use_opencl else None  # Upload once, then chain stages on the device
+        for stage in stages:
+            if gpu is not None:
+                gpu = self._run_filter_stage(gpu, *stage)
+                img = gpu.get()
+            else:
+                img = self._run_filter_stage(img, *stage)
+            img.setflags(write=False)  # Cached and shared as processed_map
+            outs.append(img)
+        return outs
+
+    def _store_filter_stages(self, plan, done, outs):
+        # Cache the outputs of plan[done:] under their prefix keys
+        for i, out in enumerate(outs, start=done + 1):
+            self._stage_cache[tuple(plan[:i])] = out
+            if len(self._stage_cache) > STAGE_CACHE_SIZE:
+                self._stage_cache.popitem(last=False)  # Evict least recently used stage
+
+    def _filter_plan(self, base):
+        # Build the ordered list of (op, param) stages for the current slider values
+        med, g, op, cl, dil, ero = (max(0, min(99, int(v.get()))) for v in (
+            self.median_var, self.blur_var, self.opening_var, self.closing_var, self.dilation_var, self.erosion_var))
+        plan = []
+        if med > 1:
+            plan.append(("median", med | 1))  # Odd kernel: even sizes round up; size 1 is a no-op
+        if g > 1:
+            plan.append(("blur", g | 1))  # Same for a 1x1 Gaussian
         if self.use_adaptive.get():
-            block = max(15, (min(img.shape[:2]) // 30) | 1)
-            th_img = cv2.adaptiveThreshold(img, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY, block, 5)
+            plan.append(("adaptive", max(15, (min(base.shape[:2]) // 30) | 1)))
         else:
-            thr = clamp(float(self.threshold_var.get()), 0.0, 1.0)
-            _, th_img = cv2.threshold(img, int(thr * 255), 255, cv2.THRESH_BINARY)
-        out = th_img
-        op = clamp(int(self.opening_var.get()), 0, 99)
+            plan.append(("threshold", int(max(0.0, min(1.0, float(self.threshold_var.get()))) * 255)))
+        # Morphology as primitives: open = erode+dilate, close = dilate+erode, then dilate, then erode.
+        # Adjacent primitives of the same kind are folded into one pass: for square kernels
+        # dilate(a) then dilate(b) equals dilate(a + b - 1) exactly (likewise for erode).
+        # Ops are never reordered, since erode/dilate do not commute.
+        prims = []
         if op > 0:
-            out = cv2.morphologyEx(out, cv2.MORPH_OPEN, morphological_kernel(op))  # Remove speckles
-        cl = clamp(int(self.closing_var.get()), 0, 99)
+            prims += [("erode", op | 1), ("dilate", op | 1)]  # Remove speckles
         if cl > 0:
-            out = cv2.morphologyEx(out, cv2.MORPH_CLOSE, morphological_kernel(cl))  # Fill gaps
-        dil = clamp(int(self.dilation_var.get()), 0, 99)
+            prims += [("dilate", cl | 1), ("erode", cl | 1)]  # Fill gaps
         if dil > 0:
-            out = cv2.dilate(out, morphological_kernel(dil))  # Thicken obstacles
-        ero = clamp(int(self.erosion_var.get()), 0, 99)
+            prims.append(("dilate", dil | 1))  # Thicken obstacles
         if ero > 0:
-            out = cv2.erode(out, morphological_kernel(ero))  # Thin obstacles
-        self.processed_map = out
-        return out
+            prims.append(("erode", ero | 1))  # Thin obstacles
+        for name, size in prims:
+            last = plan[-1]
+            if last[0] == name and last[1] + size - 1 <= 99:
+                plan[-1] = (name, last[1] + size - 1)
+            else:
+                plan.append((name, size))
+        return plan
+
+    def _run_filter_stage(self, img, op, param):
+        # Run a single filter stage on img
+        if op == "median":
+            return cv2.medianBlur(img, param)  # Remove salt-and-pepper noise
+        if op == "blur":
+            return cv2.GaussianBlur(img, (param, param), 0)  # Smooth image
+        if op == "adaptive":
+            return cv2.adaptiveThreshold(img, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY, param, 5)
+        if op == "threshold":
+            return cv2.threshold(img, param, 255, cv2.THRESH_BINARY)[1]
+        if op == "dilate":
+            return cv2.dilate(img, morphological_kernel(param))
+        if op == "erode":
+            return cv2.erode(img, morphological_kernel(param))
+        raise ValueError(f"Unknown filter stage: {op}")
+
+    def _invalidate_stage_cache(self):
+        # Drop all cached filter stage outputs
+        self._stage_cache.clear()
+        self._stage_cache_src = None
+        self._stage_cache_gen += 1
 
     def auto_enhance(self):
         # Automatically adjust filter parameters based on image analysis
@@ -421,10 +662,9 @@ class MapEnhancerWizard(tk.Tk):
         hist = cv2.calcHist([img], [0], None, [256], [0, 256]).flatten()
         total = img.size
         mean_val = float((hist * np.arange(256)).sum() / max(total, 1))
-        lap = cv2.Laplacian(img, cv2.CV_64F)
-        lap_var = float(lap.var())  # Measure image noise
+        lap_var = laplacian_variance(img)  # Measure image noise on a stratified row sample
         try:
-            _ret, _ = cv2.threshold(img, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+            _ret = otsu_threshold(hist)  # Otsu from the histogram, no extra pass over img
             thr = _ret / 255.0
             use_adapt = False
             if lap_var > 120.0:
@@ -447,16 +687,16 @@ class MapEnhancerWizard(tk.Tk):
         dark_ratio = hist[:64].sum() / total
         bright_ratio = hist[192:].sum() / total
         obstacles_are_black = dark_ratio >= bright_ratio
-        bin_obs = (bw == (0 if obstacles_are_black else 255)).astype(np.uint8) * 255
-        if bin_obs.max() > 0:
+        bin_obs = cv2.bitwise_not(bw) if obstacles_are_black else bw  # bw is strictly 0/255
+        obs_count = cv2.countNonZero(bin_obs)
+        if obs_count > 0:
             dist = cv2.distanceTransform(bin_obs, cv2.DIST_L2, 3)
             edge = cv2.Canny(bin_obs, 50, 150)
-            dvals = dist[edge > 0]
-            mean_thick = float(dvals.mean() * 2.0) if dvals.size else 1.0
+            mean_thick = float(cv2.mean(dist, mask=edge)[0] * 2.0) if cv2.countNonZero(edge) else 1.0
         else:
             mean_thick = 1.0
-        known_mask = (img != 205) if 205 in np.unique(img) else np.ones_like(img, dtype=bool)
-        occ_ratio = float((bin_obs > 0).sum()) / float(known_mask.sum() + 1e-6)
+        known_count = total - hist[205]  # Pixels not marked unknown (205)
+        occ_ratio = float(obs_count) / float(known_count + 1e-6)
         res_m = safe_float(self.map_metadata.get("resolution", 0.05), 0.05)
         target_wall_m = 0.15
         target_px = clamp(int(round(target_wall_m / max(res_m, 1e-6))), 1, 15)
@@ -470,14 +710,8 @@ class MapEnhancerWizard(tk.Tk):
             erosion = clamp(int(round(mean_thick - target_px)), 0, 8)
         if opening and erosion:
             erosion = max(0, erosion - 1)
-        self.threshold_var.set(round(thr, 3))
-        self.use_adaptive.set(bool(use_adapt))
-        self.blur_var.set(int(g))
-        self.median_var.set(int(med))
-        self.opening_var.set(int(opening))
-        self.closing_var.set(int(closing))
-        self.dilation_var.set(int(dilation))
-        self.erosion_var.set(int(erosion))
+        self._apply_snapshot(FilterState(round(thr, 3), bool(use_adapt), int(g), int(med),
+                                         int(opening), int(closing), int(dilation), int(erosion)))
         self._push_history_snapshot()
         self.update_preview()
         self._status(f"Auto-Enhance | lapVar={lap_var:.1f} meanPix={mean_val:.1f} wall≈{mean_thick:.1f}px target≈{target_px}px occ={occ_ratio*100:.1f}%")
@@ -515,7 +749,7 @@ class MapEnhancerWizard(tk.Tk):
             self.zoom_factor *= 0.9
             self.zoom_factor = max(self.zoom_factor, 0.05)
         self._update_zoom_label()
-        self.update_preview()
+        self._schedule_preview()
 
     def _update_zoom_label(self):
         # Update zoom level display
@@ -534,169 +768,309 @@ class MapEnhancerWizard(tk.Tk):
         self.pan_x += dx
         self.pan_y += dy
         self.pan_start = (ev.x, ev.y)
-        self.update_preview()
+        self._shift_preview(dx, dy)
+
+    def _shift_preview(self, dx, dy):
+        # Pan only: translate the drawn image and overlay, skipping filters, composition and upload
+        if self._image_item is None:
+            self.update_preview()
+            return
+        self.canvas.move("all", dx, dy)
+        self._update_affines()
+
+    def _update_affines(self):
+        # Bake the image<->canvas transform of the last draw (scale, centring offset and pan)
+        s = self.last_draw["scale"]
+        tx = self.last_draw["ox"] + int(self.pan_x)
+        ty = self.last_draw["oy"] + int(self.pan_y)
+        self._fwd_affine = np.array([[s, 0.0, tx], [0.0, s, ty]], dtype=np.float64)
+        self._fwd_params = (s, tx, ty)  # Plain floats for scalar conversions on event paths
+        if s > 0:
+            self._inv_affine = np.array([[1.0 / s, 0.0, -tx / s], [0.0, 1.0 / s, -ty / s]], dtype=np.float64)
+        else:
+            self._inv_affine = None
 
     def _to_canvas(self, x, y):
         # Convert image coordinates to canvas coordinates
-        s = self.last_draw["scale"]
-        ox = self.last_draw["ox"]
-        oy = self.last_draw["oy"]
-        return ox + int(x*s) + int(self.pan_x), oy + int(y*s) + int(self.pan_y)
+        s, tx, ty = self._fwd_params
+        return math.floor(x * s) + tx, math.floor(y * s) + ty
+
+    def _to_canvas_batch(self, pts):
+        # Convert an (N, 2) array of image coordinates to integer canvas coordinates in one call
+        pts = np.asarray(pts, dtype=np.float64).reshape(-1, 2)
+        M = self._fwd_affine
+        return np.floor(pts @ M[:, :2].T + M[:, 2]).astype(np.int64)
 
     def _from_canvas(self, cx, cy):
         # Convert canvas coordinates to image coordinates
-        s = self.last_draw["scale"]
-        ox = self.last_draw["ox"]
-        oy = self.last_draw["oy"]
-        if s <= 0: return None
+        if self._inv_affine is None: return None
         base = self.processed_map if self.processed_map is not None else self.filter_input_map
         if base is None:
             return None
-        x = (cx - ox - self.pan_x) / s
-        y = (cy - oy - self.pan_y) / s
+        s, tx, ty = self._fwd_params
+        x = (cx - tx) / s
+        y = (cy - ty) / s
         h, w = base.shape
         if x < 0 or y < 0 or x >= w or y >= h: return None
         return (float(x), float(y))
 
     def _on_canvas_click(self, ev):
-        # Delegate single-click events to Optimizer in Optimization tab
-        if self.active_tab == "Optimization":
-            self.optimizer.on_canvas_click(ev)
+        # Delegate single-click events to Optimizer (bound only while in Optimization tab)
+        self.optimizer.on_canvas_click(ev)
 
     def _on_canvas_double_click(self, ev):
-        # Delegate double-click events to Optimizer in Optimization tab
-        if self.active_tab == "Optimization":
-            self.optimizer.on_canvas_double_click(ev)
+        # Delegate double-click events to Optimizer (bound only while in Optimization tab)
+        self.optimizer.on_canvas_double_click(ev)
+
+    def _bind_canvas_clicks(self, enabled):
+        # Bind control-point clicks only while they are used, so other tabs never dispatch to Python
+        if enabled:
+            self.canvas.bind("<ButtonPress-1>", self._on_canvas_click)  # Left-click for control points
+            self.canvas.bind("<Double-Button-1>", self._on_canvas_double_click)  # Double-click to remove connections
+        else:
+            self.canvas.unbind("<ButtonPress-1>")
+            self.canvas.unbind("<Double-Button-1>")
 
-    def _compose_preview_image(self, base_override=None):
-        # Create preview image based on mode (original, enhanced, side-by-side)
+    def _preview_sources(self, base_override=None):
+        # Pick the source image(s) for the current preview mode (one, or two for side-by-side)
         if self.filter_input_map is None and self.processed_map is None:
             return None
         mode = self.preview_mode.get()
         if mode == "original":
-            base = self.original_map if self.original_map is not None else (self.filter_input_map if self.filter_input_map is not None else self.processed_map)
-        elif mode == "enhanced":
-            base = base_override if base_override is not None else (self.processed_map if self.processed_map is not None else self.filter_input_map)
+            return (self.original_map if self.original_map is not None else (self.filter_input_map if self.filter_input_map is not None else self.processed_map),)
+        if mode == "enhanced":
+            return (base_override if base_override is not None else (self.processed_map if self.processed_map is not None else self.filter_input_map),)
+        left = self.original_map if self.original_map is not None else (self.filter_input_map if self.filter_input_map is not None else self.processed_map)
+        right = base_override if base_override is not None else (self.processed_map if self.processed_map is not None else self.filter_input_map)
+        if left is None or right is None:
+            return None
+        return (left, right)
+
+    def _preview_shape(self, srcs):
+        # Full-resolution (h, w) of the composed preview; side-by-side adds a 4 px separator
+        if len(srcs) == 1:
+            return srcs[0].shape[:2]
+        (h1, w1), (h2, w2) = srcs[0].shape[:2], srcs[1].shape[:2]
+        return max(h1, h2), w1 + w2 + 4
+
+    def _compose_preview_image(self, srcs, size, scale):
+        # Create the preview at display size: resize sources first, then invert/grid on the small buffer
+        new_w, new_h = size
+        interp = self._preview_interp(scale)
+        key = (self.preview_mode.get(), bool(self.invert_view.get()), bool(self.show_grid.get()), size, interp)
+        cache = self._composed_cache
+        if cache["key"] == key and len(cache["srcs"]) == len(srcs) and all(a is b for a, b in zip(cache["srcs"], srcs)):
+            return cache["img"]  # Same sources, toggles and size: reuse composition (e.g. pan)
+        h, w = self._preview_shape(srcs)
+        sx = new_w / w
+        sy = new_h / h
+        img = cache["img"]
+        if img is None or img.shape != (new_h, new_w):
+            img = np.empty((new_h, new_w), np.uint8)  # Reused across frames of the same display size
+        if len(srcs) == 1:
+            cv2.resize(self._pyramid_level(srcs[0], scale), (new_w, new_h), dst=img, interpolation=interp)
         else:
-            left = self.original_map if self.original_map is not None else (self.filter_input_map if self.filter_input_map is not None else self.processed_map)
-            right = base_override if base_override is not None else (self.processed_map if self.processed_map is not None else self.filter_input_map)
-            if left is None or right is None:
-                return None
-            h1, w1 = left.shape
-            h2, w2 = right.shape
-            h = max(h1, h2)
-            canvas = np.full((h, w1 + w2 + 4), 255, np.uint8)
-            canvas[:h1, :w1] = left
-            canvas[:h2, w1 + 4:w1 + 4 + w2] = right
-            base = canvas
-        img = base.copy()
+            x = 0
+            filled = 0  # Columns written so far
+            for src in srcs:
+                sh, sw = src.shape[:2]
+                x0 = int(round(x * sx))
+                pw = min(int(round((x + sw) * sx)), new_w) - x0
+                ph = min(int(round(sh * sy)), new_h)
+                if x0 > filled:
+                    img[:, filled:x0] = 255  # Separator between the two panels
+                if pw > 0:
+                    if ph > 0:
+                        cv2.resize(self._pyramid_level(src, scale), (pw, ph), dst=img[:ph, x0:x0 + pw],
+                                   interpolation=interp)  # Straight into the panel
+                    img[ph:, x0:x0 + pw] = 255  # Below a shorter panel
+                    filled = max(filled, x0 + pw)
+                x += sw + 4  # Separator between the two panels
+            img[:, filled:] = 255  # Any remaining right margin
         if self.invert_view.get():
-            img = 255 - img  # Invert for visual effect
+            cv2.bitwise_not(img, dst=img)  # Invert for visual effect, in place
         if self.show_grid.get():
-            step = max(10, min(img.shape[0], img.shape[1]) // 40)
-            vis = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
-            for x in range(0, vis.shape[1], step):
-                cv2.line(vis, (x, 0), (x, vis.shape[0]-1), (180, 180, 180), 1, cv2.LINE_AA)
-            for y in range(0, vis.shape[0], step):
-                cv2.line(vis, (0, y), (vis.shape[1]-1, y), (180, 180, 180), 1, cv2.LINE_AA)
-            img = vis
-        else:
-            if img.ndim != 2:
-                img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+            step = max(10, min(h, w) // 40)  # Grid spacing in map pixels
+            xs = (np.arange(0, w, step) * sx).astype(np.intp)
+            ys = (np.arange(0, h, step) * sy).astype(np.intp)
+            img[:, xs] = 180  # Vertical grid lines in one strided store (grid is gray, stay single-channel)
+            img[ys, :] = 180  # Horizontal grid lines
+        cache.update(key=key, srcs=srcs, img=img, gen=cache["gen"] + 1)
         return img
 
+    def _preview_interp(self, scale):
+        # Resampling for the preview: NEAREST when enlarging, bilinear for mild shrinks, AREA below 1/2
+        if scale >= 1.0:
+            return cv2.INTER_NEAREST
+        if scale >= 0.5:
+            return cv2.INTER_LINEAR  # Every source pixel still contributes, ~8x cheaper than AREA here
+        return cv2.INTER_AREA
+
+    def _pyramid_level(self, src, scale):
+        # Coarsest halved copy of src that still leaves at least a 2x area reduction for the final resize
+        if scale >= 0.25:
+            return src
+        levels = next((lv for s0, lv in self._pyramids if s0 is src), None)
+        if levels is None:
+            levels = [src]
+            self._pyramids = ([(src, levels)] + self._pyramids)[:2]  # One pyramid per side-by-side panel
+        want = int(-math.log2(scale)) - 1
+        while len(levels) <= want:
+            top = levels[-1]
+            if min(top.shape[:2]) < 2 * PYRAMID_MIN_SIDE:
+                break
+            levels.append(cv2.resize(top, (top.shape[1] // 2, top.shape[0] // 2), interpolation=cv2.INTER_AREA))
+        return levels[min(want, len(levels) - 1)]
+
+    def _invalidate_composed_cache(self):
+        # Force the next preview to recompose from its source images (the buffer itself is kept for reuse)
+        self._composed_cache.update(key=None, srcs=())
+
+    def _schedule_preview(self):
+        # Coalesce bursts of redraw requests (wheel, window resize) into one preview per frame
+        if self._preview_after_id is None:
+            self._preview_after_id = self.after(PREVIEW_FRAME_MS, self._run_scheduled_preview)
+
+    def _run_scheduled_preview(self):
+        # Timer callback for _schedule_preview
+        self._preview_after_id = None
+        self.update_preview()
+
     def update_preview(self):
         # Update the canvas with the current map and overlays
+        if self._preview_after_id is not None:
+            self.after_cancel(self._preview_after_id)  # This redraw supersedes the scheduled one
+            self._preview_after_id = None
         if self.active_tab == "Filtering":
-            self.apply_filters()
+            self._apply_filters_async()  # Large maps keep showing the previous result until the job lands
         base_override = self.optimizer.working_map if (self.preview_mode.get()=="enhanced" and self.optimizer.working_map is not None) else None
         try:
             src = base_override if base_override is not None else (self.processed_map if self.processed_map is not None else self.filter_input_map)
-            if src is not None:
-                occ_black = (src == 0).sum()
+            if src is not None and src is not self._metrics_src:  # Same image as last time: label is current
                 total = src.size
+                if src.dtype == np.uint8 and src.ndim == 2:
+                    occ_black = total - cv2.countNonZero(src)  # No temporary mask
+                else:
+                    occ_black = (src == 0).sum()
                 occ_ratio = occ_black / max(total, 1)
                 self.metrics_label_var.set(f"Obstacles≈{occ_ratio*100:.1f}% | size {src.shape[1]}×{src.shape[0]}")
+                self._metrics_src = src
         except Exception:
             pass
-        img = self._compose_preview_image(base_override=base_override)
-        if img is None:
+        srcs = self._preview_sources(base_override=base_override)
+        if srcs is None:
             return
         cw = max(self.canvas.winfo_width(), 1)
         ch = max(self.canvas.winfo_height(), 1)
-        h, w = img.shape[:2]
+        h, w = self._preview_shape(srcs)
         scale = min(cw / w, ch / h) * self.zoom_factor
         if scale <= 0:
             return
-        new_w = clamp(int(w * scale), 1, 10000)
-        new_h = clamp(int(h * scale), 1, 10000)
-        interp = cv2.INTER_NEAREST if scale >= 1.0 else cv2.INTER_AREA
-        disp = cv2.resize(img, (new_w, new_h), interpolation=interp)
+        new_w = max(1, min(MAX_PREVIEW_DIM, int(w * scale)))  # Inline clamp: runs on every redraw
+        new_h = max(1, min(MAX_PREVIEW_DIM, int(h * scale)))
+        disp = self._compose_preview_image(srcs, (new_w, new_h), scale)
         self.last_draw["scale"] = scale
         self.last_draw["ox"] = (cw - new_w) // 2
         self.last_draw["oy"] = (ch - new_h) // 2
-        self.photo_cache = cv_to_photo(disp)
-        self.canvas.delete("all")
+        self._update_affines()
+        overlay_key = self._overlay_key()
+        photo_key = (self._composed_cache["gen"], overlay_key)
+        if photo_key != self._photo_key:  # Pure pan reuses the composed image: skip the Tk upload
+            if overlay_key is not None:
+                disp = self._draw_overlay(disp)
+            if self.photo_cache is not None and self._photo_shape == disp.shape:
+                cv_to_photo(disp, self.photo_cache, rgb=True)  # Same size: update pixels of the existing Tk image
+            else:
+                self.photo_cache = cv_to_photo(disp, rgb=True)
+                self._photo_shape = disp.shape
+            self._photo_key = photo_key
         x0 = self.last_draw["ox"] + int(self.pan_x)
         y0 = self.last_draw["oy"] + int(self.pan_y)
-        self.canvas.create_image(x0, y0, anchor=tk.NW, image=self.photo_cache)
-        if self.show_cp_overlay and self.preview_mode.get() == "enhanced" and self.optimizer.points:
-            for (i,j) in self.optimizer.pairs:
-                xi, yi = self.optimizer.points[i]
-                xj, yj = self.optimizer.points[j]
-                cxi, cyi = self._to_canvas(xi, yi)
-                cxj, cyj = self._to_canvas(xj, yj)
-                self.canvas.create_line(cxi, cyi, cxj, cyj, fill="green", width=3)
-            for idx, (x, y) in enumerate(self.optimizer.points):
-                cx, cy = self._to_canvas(x, y)
-                r = max(5, int(1.1 * self.last_draw["scale"]))
-                if idx in self.optimizer.anchor_idx:
-                    fill_color = "#2563EB"
-                else:
-                    fill_color = "red"
-                self.canvas.create_oval(cx - r, cy - r, cx + r, cy + r, fill=fill_color, outline="black", width=1)
-            if self.optimizer.selected is not None:
-                sx, sy = self._to_canvas(*self.optimizer.points[self.optimizer.selected])
-                R = self.optimizer.hit_radius
-                self.canvas.create_oval(sx-R, sy-R, sx+R, sy+R, outline="#33ff33", width=2, dash=(3,2))
+        if self._image_item is None:
+            self._image_item = self.canvas.create_image(x0, y0, anchor=tk.NW, image=self.photo_cache)
+        else:
+            self.canvas.coords(self._image_item, x0, y0)  # Move the existing item instead of recreating it
+            self.canvas.itemconfigure(self._image_item, image=self.photo_cache)
+
+    def _overlay_key(self):
+        # Everything the control-point overlay depends on, or None when it is hidden
+        opt = self.optimizer
+        if not (self.show_cp_overlay and self.preview_mode.get() == "enhanced" and len(opt.points)):
+            return None
+        return (opt.points.tobytes(), tuple(opt.pairs), frozenset(opt.anchor_idx), opt.selected, opt.hit_radius,
+                self.last_draw["scale"])
+
+    def _draw_overlay(self, disp):
+        # Rasterize pairs, control points and the selection ring onto an RGB copy of the preview
+        vis = self._overlay_buf
+        if vis is None or vis.shape[:2] != disp.shape[:2]:
+            vis = self._overlay_buf = np.empty(disp.shape[:2] + (3,), np.uint8)
+        cv2.cvtColor(disp, cv2.COLOR_GRAY2RGB, dst=vis)  # Drawn in RGB so the Tk upload needs no channel swap
+        s = self.last_draw["scale"]
+        pxy = np.floor(np.asarray(self.optimizer.points, dtype=np.float64) * s).astype(np.int32)  # Image-local pixels
+        if self.optimizer.pairs:
+            lines = pxy[np.asarray(self.optimizer.pairs, dtype=np.intp)]  # (M, 2, 2) segment endpoints
+            cv2.polylines(vis, list(lines), False, (0, 128, 0), 3, cv2.LINE_AA)  # Tk "green"
+        r = max(5, int(1.1 * s))
+        anchors = self.optimizer.anchor_idx
+        for idx, (cx, cy) in enumerate(pxy.tolist()):
+            fill_color = (37, 99, 235) if idx in anchors else (255, 0, 0)  # "#2563EB" / red
+            cv2.circle(vis, (cx, cy), r, fill_color, -1, cv2.LINE_AA)
+            cv2.circle(vis, (cx, cy), r, (0, 0, 0), 1, cv2.LINE_AA)
+        if self.optimizer.selected is not None:
+            sx, sy = pxy[self.optimizer.selected].tolist()
+            R = self.optimizer.hit_radius
+            for a in range(0, 360, 30):  # Dashed ring
+                cv2.ellipse(vis, (sx, sy), (R, R), 0, a, a + 18, (51, 255, 51), 2, cv2.LINE_AA)
+        return vis
 
     def _on_tab_changed(self, e):
         # Handle tab switching and state updates
+        self._settle_filters()  # The tab being left may still be filtering in the background
         try:
             tab_text = self.nb.tab(self.nb.select(), "text")
         except Exception:
             tab_text = "Filtering"
         self.active_tab = tab_text
         self.show_cp_overlay = (tab_text == "Optimization")
+        self._bind_canvas_clicks(self.show_cp_overlay)
         if tab_text != "Optimization" and self.optimizer.working_map is not None:
-            self.processed_map = self.optimizer.working_map.copy()
-            self.filter_input_map = self.processed_map.copy()
+            self.processed_map = self.optimizer.working_map
+            self.filter_input_map = self.processed_map
             self.optimizer.reset_state()
         self.update_preview()
 
     def _snapshot(self):
         # Capture current filter parameters for undo/redo
-        return dict(
-            threshold=float(self.threshold_var.get()),
-            adaptive=bool(self.use_adaptive.get()),
-            blur=int(self.blur_var.get()),
-            median=int(self.median_var.get()),
-            opening=int(self.opening_var.get()),
-            closing=int(self.closing_var.get()),
-            dilation=int(self.dilation_var.get()),
-            erosion=int(self.erosion_var.get()),
+        return FilterState(
+            float(self.threshold_var.get()),
+            bool(self.use_adaptive.get()),
+            int(self.blur_var.get()),
+            int(self.median_var.get()),
+            int(self.opening_var.get()),
+            int(self.closing_var.get()),
+            int(self.dilation_var.get()),
+            int(self.erosion_var.get()),
         )
 
     def _apply_snapshot(self, s):
-        # Restore filter parameters from a snapshot
-        self.threshold_var.set(float(s.get("threshold", 0.5)))
-        self.use_adaptive.set(bool(s.get("adaptive", False)))
-        self.blur_var.set(int(s.get("blur", 0)))
-        self.median_var.set(int(s.get("median", 0)))
-        self.opening_var.set(int(s.get("opening", 0)))
-        self.closing_var.set(int(s.get("closing", 0)))
-        self.dilation_var.set(int(s.get("dilation", 0)))
-        self.erosion_var.set(int(s.get("erosion", 0)))
+        # Restore filter parameters from a snapshot without triggering the slider debounce
+        if self._scale_after_id is not None:
+            self.after_cancel(self._scale_after_id)  # A pending drag is superseded by the restored state
+            self._scale_after_id = None
+            self._pending_scale_cb = None
+        self._restoring = True
+        try:
+            self.threshold_var.set(float(s.threshold))
+            self.use_adaptive.set(bool(s.adaptive))
+            self.blur_var.set(int(s.blur))
+            self.median_var.set(int(s.median))
+            self.opening_var.set(int(s.opening))
+            self.closing_var.set(int(s.closing))
+            self.dilation_var.set(int(s.dilation))
+            self.erosion_var.set(int(s.erosion))
+        finally:
+            self._restoring = False
 
     def _clear_history(self):
         # Clear undo/redo stacks
@@ -731,14 +1105,7 @@ class MapEnhancerWizard(tk.Tk):
 
     def reset_filters(self):
         # Reset all filter parameters to defaults
-        self.threshold_var.set(0.5)
-        self.use_adaptive.set(False)
-        self.blur_var.set(0)
-        self.median_var.set(0)
-        self.opening_var.set(0)
-        self.closing_var.set(0)
-        self.dilation_var.set(0)
-        self.erosion_var.set(0)
+        self._apply_snapshot(FilterState(0.5, False, 0, 0, 0, 0, 0, 0))
         self._push_history_snapshot()
         self.update_preview()
         self._status("Filters reset.")
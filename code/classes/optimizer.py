@@ -10,6 +10,19 @@ from utils.safe_int import safe_int
 from utils.safe_float import safe_float
 from classes.tooltip import ToolTip
 
+# Points per row block in the blocked passes (neighbor lists, corner windows, anchor matching),
+# so each temporary distance or gather matrix stays NEIGHBOR_BLOCK rows tall
+NEIGHBOR_BLOCK = 256
+
+# Kernel pixels stamped per block when recomposing the occupancy map
+STAMP_BLOCK_PX = 1 << 20
+
+# Optimizer iterations run between two preview redraws while running
+LOOP_BATCH = 5
+
+# Longest side (px) the anchor edge analysis runs at; larger maps are analysed downsampled
+EDGE_MAX_DIM = 2048
+
 class Optimizer:
     def __init__(self, app):
         # Initialize with reference to main application
@@ -47,22 +60,34 @@ class Optimizer:
             v.trace_add("write", _rebuild_on_change)
 
         # Control point and optimization state
-        self.points = []                               # Current control points [(x,y), ...]
-        self.init = []                                 # Initial control points
-        self.prev = []                                 # Previous control points
-        self.pairs = []                                # User-defined constraint pairs [(i,j), ...]
+        self.points = np.empty((0,2), np.float32)      # Current control points, (N, 2) float32 array
+        self.init = self.points                        # Initial control points
+        self.prev = self.points                        # Previous control points
+        self._next_buf = None                          # Spare (N, 2) buffer iterate_once writes candidates into
+        self.pairs = ()                                # User-defined constraint pairs ((i,j), ...), an immutable tuple
+        self._pairs_src = None                         # pairs tuple the cached index array belongs to
+        self._pairs_arr = None                         # (M, 2) intp array of _pairs_src
         self.selected = None                           # Currently selected control point index
         self.hit_radius = 14                           # Click radius for selecting points
         self.running = False                           # Optimization running state
         self.last_score = None                         # Last computed score
-        self.neighbors = None                          # Neighbor indices for each point
-        self.kernels = []                              # Kernels for each control point
+        self.neighbors = None                          # CSR neighbor indices (indptr, indices) for each point
+        self.kernels = []                              # (N, k, k) uint8 kernel stack, one per control point
         self.base_map = None                           # Base map for optimization
         self.base_occ = None                           # Base occupancy (binary)
         self.work_occ = None                           # Working occupancy map
         self.working_map = None                        # Current optimized map
         self.need_prepare = False                      # Flag for re-preparation
         self.anchor_idx = set()                        # Indices of anchor points
+        self._anchor_mask_src = None                   # anchor_idx set the cached mask was built from
+        self._anchor_mask_cache = None                 # (N, 1) bool mask of anchors, broadcast over x/y
+        self._occ_coords_src = None                    # Map the cached occupied coordinates belong to
+        self._occ_coords = None                        # Cached (N, 2) float32 occupied pixel coordinates
+        self._edge_src = None                          # Base map the cached edges/orientation belong to
+        self._edge_cache = None                        # (edges, theta_bin) of _edge_src
+        self._cuda_detector = None                     # cv2.cuda corner detector (None on CPU-only builds)
+        self._cuda_detector_q = None                   # qualityLevel the detector was created with
+        self._iter_params = None                       # Cached (alpha, lc, ls, tol) floats; None after an edit
 
         # Bind traces for optimization parameters
         self.bind_param_traces()
@@ -71,12 +96,23 @@ class Optimizer:
         # Mark optimization as needing preparation when parameters change
         def mark_dirty(*_):
             self.need_prepare = True
+        def drop_iter_params(*_):
+            self._iter_params = None  # Re-read from Tk on the next iteration
         for v in [self.kernel, self.alpha, self.lc, self.ls, self.nb_radius, self.max_iters, self.tol]:
             v.trace_add("write", mark_dirty)
+        for v in [self.alpha, self.lc, self.ls, self.tol]:
+            v.trace_add("write", drop_iter_params)
+
+    def iter_params(self):
+        # (alpha, lc, ls, tol) as plain floats, read from the Tk variables only after they change
+        if self._iter_params is None:
+            self._iter_params = (float(self.alpha.get()), float(self.lc.get()),
+                                 float(self.ls.get()), float(self.tol.get()))
+        return self._iter_params
 
     def _rebuild_anchors_if_any(self):
         # Rebuild anchor points if control points exist
-        if self.points:
+        if len(self.points):
             self.assign_anchor_points()
             self.app.update_preview()
 
@@ -162,15 +198,15 @@ class Optimizer:
             data = pts
         Z = data.astype(np.float32)
         criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 25, 1.0)
-        ret, labels, centers = cv2.kmeans(Z, N, None, criteria, 3, cv2.KMEANS_PP_CENTERS)
+        ret, labels, centers = cv2.kmeans(Z, N, None, criteria, 1, cv2.KMEANS_PP_CENTERS)  # k-means++ seeding: one attempt suffices
         centers = centers.astype(np.float32)
         h, w = src.shape
         centers[:,0] = np.clip(np.round(centers[:,0]), 0, w-1)
         centers[:,1] = np.clip(np.round(centers[:,1]), 0, h-1)
-        self.points = [(float(x), float(y)) for (x,y) in centers]
-        self.init = [(float(x), float(y)) for (x,y) in centers]
-        self.prev = [(float(x), float(y)) for (x,y) in centers]
-        self.pairs = []
+        self.points = centers
+        self.init = centers.copy()
+        self.prev = centers
+        self.pairs = ()
         self.selected = None
         self.neighbors = None
         self.last_score = None
@@ -189,65 +225,84 @@ class Optimizer:
         src = self.app.processed_map if self.app.processed_map is not None else self.app.filter_input_map
         if src is None:
             return np.empty((0,2), np.float32)
-        mask = (src == 0)
-        ys, xs = np.nonzero(mask)
-        if xs.size == 0:
-            return np.empty((0,2), np.float32)
-        return np.stack([xs, ys], axis=1).astype(np.float32)
+        if src is self._occ_coords_src:
+            return self._occ_coords
+        ys, xs = np.nonzero(src == 0)
+        out = np.empty((xs.size, 2), np.float32)  # Fill columns directly, no stacked int64 temporary
+        out[:, 0] = xs
+        out[:, 1] = ys
+        out.setflags(write=False)  # Shared between calls
+        self._occ_coords_src = src
+        self._occ_coords = out
+        return out
 
     def clear_pairs(self):
         # Clear all user-defined constraint pairs
-        self.pairs = []
+        self.pairs = ()
         self.selected = None
         self.app._status("Cleared constraint pairs.")
         self.app.update_preview()
 
     def build_neighbors(self):
-        # Build neighbor lists for each control point based on radius
-        if not self.points:
-            self.neighbors = []
+        # Build CSR neighbor lists (indptr, indices) for each control point based on radius
+        if len(self.points) == 0:
+            self.neighbors = (np.zeros(1, np.int32), np.empty(0, np.int32))
             return
-        pts = np.array(self.points, dtype=np.float32)
+        pts = self.points
         R = float(self.nb_radius.get())
         R2 = R*R
         n = len(pts)
-        neigh = [[] for _ in range(n)]
-        for i in range(n):
-            dx = pts[:,0] - pts[i,0]
-            dy = pts[:,1] - pts[i,1]
+        counts = []
+        cols = []
+        for s in range(0, n, NEIGHBOR_BLOCK):
+            blk = pts[s:s + NEIGHBOR_BLOCK]
+            dx = pts[None, :, 0] - blk[:, None, 0]
+            dy = pts[None, :, 1] - blk[:, None, 1]
             d2 = dx*dx + dy*dy
-            idxs = np.where((d2 > 0.0) & (d2 <= R2))[0]
-            neigh[i] = idxs.tolist()
-        self.neighbors = neigh
+            rows, c = np.nonzero((d2 > 0.0) & (d2 <= R2))
+            counts.append(np.bincount(rows, minlength=len(blk)))
+            cols.append(c)
+        indptr = np.zeros(n + 1, np.int32)
+        np.cumsum(np.concatenate(counts), out=indptr[1:])
+        self.neighbors = (indptr, np.concatenate(cols).astype(np.int32))
 
     def score(self, P):
         # Compute optimization score based on constraint pairs
         if not self.pairs:
             return 0.0
-        pts = np.array(P, dtype=np.float32)
-        s = 0.0
-        for (i,j) in self.pairs:
-            d = pts[j] - pts[i]
-            s += float(d[0]*d[0] + d[1]*d[1])
-        return s
+        pts = np.asarray(P, dtype=np.float32)
+        pr = self.pair_array()
+        d = pts[pr[:, 1]] - pts[pr[:, 0]]
+        return float((d[:, 0]*d[:, 0] + d[:, 1]*d[:, 1]).sum(dtype=np.float64))  # Squared pair lengths
+
+    def pair_array(self):
+        # Constraint pairs as an (M, 2) index array, converted once per pairs tuple
+        if self.pairs is not self._pairs_src:
+            self._pairs_arr = np.asarray(self.pairs, dtype=np.intp).reshape(-1, 2)
+            self._pairs_src = self.pairs
+        return self._pairs_arr
 
     def forces(self, P):
         # Compute forces for control point movement
         n = len(P)
         F = np.zeros((n,2), np.float32)
-        pts = np.array(P, dtype=np.float32)
-        lc = float(self.lc.get())
-        ls = float(self.ls.get())
-        for (i,j) in self.pairs:
-            d = pts[j] - pts[i]
-            F[i] += lc * d  # Pull paired points together
-            F[j] += lc * (-d)
+        pts = np.asarray(P, dtype=np.float32)
+        _, lc, ls, _ = self.iter_params()
+        if self.pairs:
+            pr = self.pair_array()
+            d = lc * (pts[pr[:, 1]] - pts[pr[:, 0]])
+            np.add.at(F, pr[:, 0], d)  # Pull paired points together (unbuffered: repeated indices accumulate)
+            np.add.at(F, pr[:, 1], -d)
         if self.neighbors is None:
             self.build_neighbors()
-        for i, neigh in enumerate(self.neighbors or []):
-            if not neigh: continue
-            diff = pts[neigh] - pts[i]
-            F[i] += ls * diff.sum(axis=0)  # Laplacian smoothing
+        indptr, indices = self.neighbors
+        if indices.size:
+            deg = np.diff(indptr)
+            rows = np.repeat(np.arange(n), deg)
+            nsum = np.empty((n, 2), np.float64)
+            nsum[:, 0] = np.bincount(rows, weights=pts[indices, 0], minlength=n)
+            nsum[:, 1] = np.bincount(rows, weights=pts[indices, 1], minlength=n)
+            F += (ls * (nsum - deg[:, None] * pts)).astype(np.float32)  # Laplacian smoothing
         return F
 
     def extract_kernel_at(self, occ01, cx, cy, k):
@@ -266,54 +321,62 @@ class Optimizer:
         return karr
 
     def compose_from_kernels(self, prev_occ, prev_positions, new_positions, kernels):
-        # Reconstruct occupancy map by moving kernels to new positions
-        out = prev_occ.copy()
-        h, w = out.shape
-        k = kernels[0].shape[0] if kernels else 0
-        r = k // 2
-        for (px,py), K in zip(prev_positions, kernels):
-            cx = int(round(px)); cy = int(round(py))
-            x0 = cx - r; y0 = cy - r
-            xs0 = max(0, x0); ys0 = max(0, y0)
-            xs1 = min(w, x0 + k); ys1 = min(h, y0 + k)
-            if xs0 < xs1 and ys0 < ys1:
-                out[ys0:ys1, xs0:xs1] = 0  # Clear previous kernel
-        for (nx,ny), K in zip(new_positions, kernels):
-            cx = int(round(nx)); cy = int(round(ny))
-            x0 = cx - r; y0 = cy - r
-            xs0 = max(0, x0); ys0 = max(0, y0)
-            xs1 = min(w, x0 + k); ys1 = min(h, y0 + k)
-            if xs0 < xs1 and ys0 < ys1:
-                kx0 = xs0 - x0; ky0 = ys0 - y0
-                kx1 = kx0 + (xs1 - xs0); ky1 = ky0 + (ys1 - ys0)
-                out[ys0:ys1, xs0:xs1] = K[ky0:ky1, kx0:kx1]  # Place new kernel
+        # Reconstruct occupancy map by moving kernels to new positions (updates prev_occ in place)
+        out = prev_occ
+        kernels = np.asarray(kernels, dtype=np.uint8)
+        if len(kernels) == 0:
+            return out
+        flat_out = out.reshape(-1)  # View: work_occ is always a contiguous array of its own
+        k = kernels.shape[1]
+        step = max(1, STAMP_BLOCK_PX // (k * k))  # Point blocks bound the index arrays for large kernels
+        for s in range(0, len(kernels), step):
+            idx, valid = self._stamp_offsets(out.shape, prev_positions[s:s + step], k)
+            flat_out[idx[valid]] = 0  # Clear previous kernels
+        for s in range(0, len(kernels), step):  # Ascending blocks, so later points still paint over earlier ones
+            idx, valid = self._stamp_offsets(out.shape, new_positions[s:s + step], k)
+            idx = idx[valid]
+            vals = kernels[s:s + step].reshape(-1, k * k)[valid]
+            # Overlapping stamps: the highest point index wins, as with painting them one by one
+            _, last = np.unique(idx[::-1], return_index=True)
+            last = len(idx) - 1 - last
+            flat_out[idx[last]] = vals[last]  # Place new kernels
         return out
 
+    def _stamp_offsets(self, shape, positions, k):
+        # Flat pixel indices (N, k*k) of every kernel footprint, plus a mask of the in-bounds ones
+        h, w = shape
+        r = k // 2
+        ry, rx = np.mgrid[-r:r+1, -r:r+1].reshape(2, 1, -1)
+        xy = np.rint(positions).astype(np.intp)  # (N, 2) float32 -> pixel centres, all at once
+        xs = xy[:, 0, None] + rx
+        ys = xy[:, 1, None] + ry
+        valid = (xs >= 0) & (xs < w) & (ys >= 0) & (ys < h)
+        return ys * w + xs, valid
+
     def refresh_working_map_from_occ(self):
         # Convert binary occupancy to grayscale map
         if self.work_occ is None:
             return None
-        self.working_map = np.where(self.work_occ > 0, 0, 255).astype(np.uint8)
+        self.working_map = cv2.compare(self.work_occ, 0, cv2.CMP_EQ)  # 255 where free, 0 where occupied
+        self.working_map.setflags(write=False)  # Shared with the app as processed_map
         return self.working_map
 
     def estimate_cp_spacing(self):
         # Estimate average spacing between control points
-        if not self.points or len(self.points) < 2:
+        if len(self.points) < 2:
             return 8.0
-        pts = np.array(self.points, dtype=np.float32)
+        pts = self.points
         if len(pts) > 400:
             idx = np.random.choice(len(pts), 400, replace=False)
             pts = pts[idx]
-        dmins = []
-        for i in range(len(pts)):
-            dx = pts[:, 0] - pts[i, 0]
-            dy = pts[:, 1] - pts[i, 1]
-            d2 = dx * dx + dy * dy
-            d2[i] = 1e12
-            dmins.append(float(np.sqrt(d2.min())))
-        dmins.sort()
-        k = max(5, int(0.2 * len(dmins)))
-        return max(4.0, float(np.mean(dmins[:k])))
+        dx = pts[None, :, 0] - pts[:, None, 0]
+        dy = pts[None, :, 1] - pts[:, None, 1]
+        d2 = dx * dx + dy * dy
+        np.fill_diagonal(d2, np.inf)  # Ignore each point's distance to itself
+        dmins = np.sqrt(d2.min(axis=1))
+        k = min(len(dmins), max(5, int(0.2 * len(dmins))))
+        nearest = np.partition(dmins, k - 1)[:k]  # The k smallest, no full sort needed
+        return max(4.0, float(np.mean(nearest, dtype=np.float64)))
 
     def get_ca_vals(self):
         # Get and validate corner anchor parameters
@@ -332,52 +395,76 @@ class Optimizer:
         return amin, amax, quality, min_bcnt, min_bratio
 
     def compute_edges_and_orientation(self, base_gray_0_255):
-        # Compute edges and orientation angles for corner detection
+        # Compute edges and orientation angles for corner detection (cached per base map)
+        # Returns (edges, theta_bin, scale); scale maps map coordinates onto the edge images
+        if base_gray_0_255 is self._edge_src:
+            return self._edge_cache
         obs = (base_gray_0_255 == 0).astype(np.uint8) * 255
-        edges = cv2.Canny(obs, 80, 160, apertureSize=3, L2gradient=True)
-        gx = cv2.Sobel(obs, cv2.CV_32F, 1, 0, ksize=3)
-        gy = cv2.Sobel(obs, cv2.CV_32F, 0, 1, ksize=3)
-        ang = cv2.phase(gx, gy, angleInDegrees=True)
-        theta = (ang % 180.0).astype(np.float32)
-        return edges, theta
-
-    def has_right_angle_at(self, x, y, edges, theta, win_px):
-        # Check if a point has a right-angle corner
+        h, w = obs.shape
+        scale = 1.0
+        if max(h, w) > EDGE_MAX_DIM:
+            scale = EDGE_MAX_DIM / float(max(h, w))
+            obs = cv2.resize(obs, (max(1, round(w * scale)), max(1, round(h * scale))), interpolation=cv2.INTER_AREA)
+            obs = cv2.threshold(obs, 0, 255, cv2.THRESH_BINARY)[1]  # Any obstacle coverage survives, thin walls included
+        # One pair of Sobel passes feeds both Canny (precomputed-gradient overload) and the phase
+        gx = cv2.Sobel(obs, cv2.CV_16S, 1, 0, ksize=3, borderType=cv2.BORDER_REPLICATE)
+        gy = cv2.Sobel(obs, cv2.CV_16S, 0, 1, ksize=3, borderType=cv2.BORDER_REPLICATE)
+        edges = cv2.Canny(gx, gy, 80, 160, L2gradient=True)
+        ang = cv2.phase(gx.astype(np.float32), gy.astype(np.float32), angleInDegrees=True)
+        theta = ang % 180.0
+        theta_bin = np.minimum(np.floor(theta.astype(np.float64) / 5.0), 35).astype(np.uint8)  # 36 bins of 5°
+        self._edge_src = base_gray_0_255
+        self._edge_cache = (edges, theta_bin, scale)
+        return self._edge_cache
+
+    def right_angle_mask(self, pts, edges, theta_bin, win_px, ca_vals=None, scale=1.0):
+        # Right-angle corner test for an (N, 2) array of points (theta_bin: orientation in 36 bins of 5°)
         h, w = edges.shape
-        hw = int(max(5, min(60, win_px)) // 2)
-        cx = int(round(x)); cy = int(round(y))
-        x0 = max(0, cx - hw); x1 = min(w, cx + hw + 1)
-        y0 = max(0, cy - hw); y1 = min(h, cy + hw + 1)
-        patch_edges = edges[y0:y1, x0:x1]
-        if patch_edges.size == 0:
-            return False
-        mask = (patch_edges > 0)
-        if mask.sum() < 20:
-            return False
-        patch_theta = theta[y0:y1, x0:x1][mask]
-        bins = np.linspace(0.0, 180.0, 37)
-        hist, _ = np.histogram(patch_theta, bins=bins)
-        if hist.sum() < 25:
-            return False
-        top2_idx = hist.argsort()[-2:][::-1]
-        a_idx, b_idx = int(top2_idx[0]), int(top2_idx[1])
-        a_cnt, b_cnt = int(hist[a_idx]), int(hist[b_idx])
-        amin, amax, _, min_bcnt, min_bratio = self.get_ca_vals()
-        if b_cnt < max(min_bcnt, min_bratio * a_cnt):
-            return False
+        hw = int(max(5, min(60, win_px * scale)) // 2)
+        c = np.rint(np.asarray(pts, np.float32) * np.float32(scale)).astype(np.intp)
+        oy, ox = np.mgrid[-hw:hw+1, -hw:hw+1].reshape(2, 1, -1)
+        hist = np.empty((len(c), 36), np.int64)
+        for s in range(0, len(c), NEIGHBOR_BLOCK):
+            blk = c[s:s + NEIGHBOR_BLOCK]
+            ys = blk[:, 1, None] + oy
+            xs = blk[:, 0, None] + ox
+            inside = (xs >= 0) & (xs < w) & (ys >= 0) & (ys < h)
+            flat = np.clip(ys, 0, h - 1) * w + np.clip(xs, 0, w - 1)
+            on = inside & (edges.ravel()[flat] > 0)  # Edge pixels of each window, clipped at the map border
+            rows = np.nonzero(on)[0]
+            hist[s:s + len(blk)] = np.bincount(rows * 36 + theta_bin.ravel()[flat[on]],
+                                               minlength=len(blk) * 36).reshape(-1, 36)
+        count = hist.sum(axis=1)
+        ok = count >= 25 * scale  # Minimum edge pixels per window; counts shrink with the analysis scale
+        r = np.arange(len(c))
+        a_idx = 35 - hist[:, ::-1].argmax(axis=1)  # Ties go to the higher bin, as with a stable argsort
+        a_cnt = hist[r, a_idx]
+        hist[r, a_idx] = -1
+        b_idx = 35 - hist[:, ::-1].argmax(axis=1)  # Second strongest bin
+        b_cnt = hist[r, b_idx]
+        amin, amax, _, min_bcnt, min_bratio = ca_vals if ca_vals is not None else self.get_ca_vals()
+        ok &= b_cnt >= np.maximum(min_bcnt * scale, min_bratio * a_cnt)
         bin_w = 180.0 / 36.0
-        a_deg = (a_idx + 0.5) * bin_w
-        b_deg = (b_idx + 0.5) * bin_w
-        diff = abs(a_deg - b_deg)
-        if diff > 90.0:
-            diff = 180.0 - diff
-        return (amin <= diff <= amax)
+        diff = np.abs(a_idx - b_idx) * bin_w
+        diff = np.where(diff > 90.0, 180.0 - diff, diff)
+        return ok & (amin <= diff) & (diff <= amax)
 
     def detect_corners(self, src_gray_0_255):
-        # Detect corners using OpenCV's goodFeaturesToTrack
+        # Detect corners using OpenCV's goodFeaturesToTrack (CUDA build when a device is present)
         try:
-            obs = (src_gray_0_255 == 0).astype(np.uint8) * 255
-            edges = cv2.Canny(obs, 80, 160, apertureSize=3, L2gradient=True)
+            edges, _, scale = self.compute_edges_and_orientation(src_gray_0_255)  # Same Canny edges, shared cache
+            detector = self._cuda_corner_detector(self.get_ca_vals()[2])
+            if detector is not None:
+                try:
+                    gpu_edges = cv2.cuda_GpuMat()
+                    gpu_edges.upload(edges)
+                    found = detector.detect(gpu_edges)
+                    corners = None if found.empty() else found.download().reshape(-1, 1, 2)
+                    if corners is None:
+                        return []
+                    return [(float(c[0][0]) / scale, float(c[0][1]) / scale) for c in corners]
+                except cv2.error:
+                    self._cuda_detector = None  # Device failed (e.g. out of memory): stay on the CPU path
             corners = cv2.goodFeaturesToTrack(
                 image=edges,
                 maxCorners=800,
@@ -389,14 +476,29 @@ class Optimizer:
             )
             if corners is None:
                 return []
-            return [(float(c[0][0]), float(c[0][1])) for c in corners]
+            return [(float(c[0][0]) / scale, float(c[0][1]) / scale) for c in corners]
         except Exception:
             return []
 
+    def _cuda_corner_detector(self, quality):
+        # Persistent CUDA corner detector for this qualityLevel, or None without a CUDA device
+        if self._cuda_detector_q == quality:
+            return self._cuda_detector
+        detector = None
+        try:
+            if cv2.cuda.getCudaEnabledDeviceCount() > 0:
+                detector = cv2.cuda.createGoodFeaturesToTrackDetector(
+                    cv2.CV_8UC1, maxCorners=800, qualityLevel=quality, minDistance=6,
+                    blockSize=5, useHarrisDetector=True, harrisK=0.04)
+        except (AttributeError, cv2.error):
+            detector = None  # OpenCV built without the CUDA modules
+        self._cuda_detector, self._cuda_detector_q = detector, quality
+        return detector
+
     def assign_anchor_points(self):
         # Assign control points near detected corners as anchors
         self.anchor_idx = set()
-        if not self.points:
+        if len(self.points) == 0:
             return
         base = self.app.processed_map if self.app.processed_map is not None else self.app.filter_input_map
         if base is None:
@@ -405,28 +507,25 @@ class Optimizer:
         if not corners:
             self.app._status("Anchors assigned: 0 (no corners)")
             return
-        edges, theta = self.compute_edges_and_orientation(base)
+        edges, theta_bin, scale = self.compute_edges_and_orientation(base)
         spacing = self.estimate_cp_spacing()
         radius = int(max(4, min(12, 0.45 * spacing)))
         r2 = float(radius * radius)
         win_px = int(max(11, min(41, 1.2 * spacing)))
-        pts = np.array(self.points, dtype=np.float32)
-        candidates = []
-        for i, (x, y) in enumerate(pts):
-            for (cx, cy) in corners:
-                dx = cx - x
-                dy = cy - y
-                if (dx * dx + dy * dy) <= r2:
-                    candidates.append(i)
-                    break
+        pts = self.points
+        cxy = np.array(corners, dtype=np.float32)
+        near = np.zeros(len(pts), bool)
+        for s in range(0, len(pts), NEIGHBOR_BLOCK):
+            blk = pts[s:s + NEIGHBOR_BLOCK]
+            dx = cxy[None, :, 0] - blk[:, None, 0]
+            dy = cxy[None, :, 1] - blk[:, None, 1]
+            near[s:s + len(blk)] = ((dx*dx + dy*dy) <= r2).any(axis=1)
+        candidates = np.flatnonzero(near).tolist()
         if not candidates:
             self.app._status("Anchors assigned: 0 (no CPs near corners)")
             return
-        confirmed = []
-        for i in candidates:
-            x, y = pts[i]
-            if self.has_right_angle_at(x, y, edges, theta, win_px):
-                confirmed.append(i)
+        right = self.right_angle_mask(pts[candidates], edges, theta_bin, win_px, self.get_ca_vals(), scale)
+        confirmed = [i for i, ok in zip(candidates, right.tolist()) if ok]
         if not confirmed:
             self.app._status("Anchors assigned: 0 (no right-angle corners)")
             return
@@ -448,26 +547,37 @@ class Optimizer:
             self.anchor_idx = set(uniq)
         self.app._status(f"Anchors assigned: {len(self.anchor_idx)} of {len(self.points)} (radius={radius}, win={win_px}, right-angle only)")
 
+    def anchor_mask(self, n):
+        # (n, 1) boolean mask of anchor indices, rebuilt only when anchor_idx is replaced
+        m = self._anchor_mask_cache
+        if self.anchor_idx is not self._anchor_mask_src or m is None or len(m) != n:
+            idx = np.fromiter(self.anchor_idx, dtype=np.int64, count=len(self.anchor_idx))
+            m = np.zeros((n, 1), bool)
+            m[idx[(idx >= 0) & (idx < n)]] = True
+            self._anchor_mask_src = self.anchor_idx
+            self._anchor_mask_cache = m
+        return m
+
     def prepare(self):
         # Prepare optimization by initializing maps and kernels
         base = self.app.processed_map if self.app.processed_map is not None else self.app.filter_input_map
         if base is None:
             messagebox.showwarning("No Map", "Load or produce a map first.")
             return False
-        if not self.points:
+        if len(self.points) == 0:
             messagebox.showwarning("No Control Points", "Generate control points first.")
             return False
         self.base_map = base.copy()
         self.base_occ = (self.base_map == 0).astype(np.uint8)
         self.work_occ = self.base_occ.copy()
         self.refresh_working_map_from_occ()
-        self.init = [(float(x), float(y)) for (x,y) in self.points]
-        self.prev = [(float(x), float(y)) for (x,y) in self.points]
+        self.init = self.points.copy()
+        self.prev = self.points
         k = int(self.kernel.get())
         if k % 2 == 0: k += 1
         k = clamp(k, 3, 99)
         self.kernel.set(k)
-        self.kernels = [self.extract_kernel_at(self.base_occ, x, y, k) for (x,y) in self.points]
+        self.kernels = np.stack([self.extract_kernel_at(self.base_occ, x, y, k) for (x,y) in self.points.tolist()])
         self.neighbors = None
         self.build_neighbors()
         self.last_score = self.score(self.points)
@@ -478,33 +588,35 @@ class Optimizer:
 
     def iterate_once(self):
         # Perform one optimization iteration
-        P = np.array(self.points, np.float32)
+        P = self.points
         F = self.forces(P)
-        alpha = float(self.alpha.get())
-        P_new = P + alpha * F
+        alpha, _, _, tol = self.iter_params()
+        P_new = self._next_buf
+        if P_new is None or P_new.shape != P.shape:
+            P_new = self._next_buf = np.empty_like(P)
+        np.multiply(F, alpha, out=F)
+        np.add(P, F, out=P_new)  # Candidate positions go into the spare buffer, no per-step allocation
         base = self.app.processed_map if self.app.processed_map is not None else self.app.filter_input_map
         h, w = base.shape
-        P_new[:,0] = np.clip(P_new[:,0], 0, w-1)
-        P_new[:,1] = np.clip(P_new[:,1], 0, h-1)
+        np.clip(P_new, 0, np.array([w-1, h-1], np.float32), out=P_new)
         if self.anchor_idx:
-            anchor_idx = np.array(list(self.anchor_idx), dtype=np.int64)
-            anchor_idx = anchor_idx[(anchor_idx >= 0) & (anchor_idx < len(P_new))]
-            if len(anchor_idx) > 0:
-                P_new[anchor_idx] = P[anchor_idx]  # Keep anchors fixed
+            np.copyto(P_new, P, where=self.anchor_mask(len(P)))  # Keep anchors fixed
         new_score = self.score(P_new)
-        improved = (self.last_score is None) or (new_score < self.last_score - float(self.tol.get()))
+        improved = (self.last_score is None) or (new_score < self.last_score - tol)
         if improved:
-            new_positions = [(float(x), float(y)) for (x,y) in P_new]
-            self.work_occ = self.compose_from_kernels(self.work_occ, self.prev, new_positions, self.kernels)
-            self.prev = new_positions
-            self.points = new_positions
+            if not np.array_equal(np.rint(self.prev), np.rint(P_new)):
+                # Some kernel lands on a different pixel; otherwise the map is unchanged
+                self.work_occ = self.compose_from_kernels(self.work_occ, self.prev, P_new, self.kernels)
+                self.refresh_working_map_from_occ()
+            self._next_buf = P  # Old positions become the next spare buffer
+            self.prev = P_new
+            self.points = P_new
             self.last_score = new_score
-            self.refresh_working_map_from_occ()
         return improved, new_score
 
     def step_once(self):
         # Perform a single optimization step
-        if not self.points:
+        if len(self.points) == 0:
             messagebox.showwarning("No Control Points", "Generate control points first.")
             return
         if self.last_score is None or self.need_prepare:
@@ -524,16 +636,21 @@ class Optimizer:
         if it_left <= 0:
             self.stop()
             return
-        improved, score = self.iterate_once()
+        done = 0
+        for _ in range(min(LOOP_BATCH, it_left)):  # Several steps per redraw
+            improved, score = self.iterate_once()
+            done += 1
+            if not improved:
+                break
         self.app.update_preview()
         self.lbl_score.config(text=f"score: {score:.3f}")
         t = self.lbl_iter.cget("text")
         k = int(t.split(":")[-1]) if ":" in t else 0
-        self.lbl_iter.config(text=f"iter: {k+1}")
+        self.lbl_iter.config(text=f"iter: {k+done}")
         if not improved:
             self.stop()
             return
-        self.app.after(1, lambda: self.loop_tick(it_left-1))
+        self.app.after_idle(lambda: self.loop_tick(it_left-done))  # Runs once pending UI events are handled
 
     def start(self):
         # Start continuous optimization
@@ -556,8 +673,8 @@ class Optimizer:
         if self.working_map is None:
             messagebox.showinfo("Kernel Optimizer", "Nothing to apply yet.")
             return
-        self.app.processed_map = self.working_map.copy()
-        self.app.filter_input_map = self.app.processed_map.copy()
+        self.app.processed_map = self.working_map
+        self.app.filter_input_map = self.app.processed_map
         self.reset_state()
         self.app._push_history_snapshot()
         self.app.update_preview()
@@ -569,8 +686,8 @@ class Optimizer:
             return
         self.work_occ = self.base_occ.copy()
         self.refresh_working_map_from_occ()
-        self.points = [(x,y) for (x,y) in self.init]
-        self.prev = [(x,y) for (x,y) in self.init]
+        self.points = self.init.copy()
+        self.prev = self.points
         self.last_score = None
         self.lbl_iter.config(text="iter: 0")
         self.lbl_score.config(text="score: -")
@@ -580,10 +697,11 @@ class Optimizer:
     def reset_state(self):
         # Reset all optimization state
         self.running = False
-        self.points = []
-        self.init = []
-        self.prev = []
-        self.pairs = []
+        self.points = np.empty((0,2), np.float32)
+        self.init = self.points
+        self.prev = self.points
+        self._next_buf = None
+        self.pairs = ()
         self.neighbors = None
         self.kernels = []
         self.base_map = None
@@ -599,18 +717,13 @@ class Optimizer:
         # Handle single-click to select or pair control points
         if self.app.preview_mode.get() != "enhanced":
             return
-        if not self.points:
+        if len(self.points) == 0:
             return
         imgxy = self.app._from_canvas(ev.x, ev.y)
         if imgxy is None:
             return
-        best = None; bestd2 = 1e9
-        for i,(x,y) in enumerate(self.points):
-            cx, cy = self.app._to_canvas(x,y)
-            d2 = (cx-ev.x)**2 + (cy-ev.y)**2
-            if d2 < bestd2:
-                bestd2 = d2; best = i
-        if best is None or bestd2 > (self.hit_radius**2):
+        best = self._nearest_point(ev)
+        if best is None:
             return
         if self.selected is None:
             self.selected = best
@@ -620,28 +733,32 @@ class Optimizer:
             if i != j:
                 pair = (min(i,j), max(i,j))
                 if pair in self.pairs:
-                    self.pairs.remove(pair)
+                    self.pairs = tuple(p for p in self.pairs if p != pair)
                 else:
-                    self.pairs.append(pair)
+                    self.pairs = self.pairs + (pair,)
             self.selected = None
         self.app.update_preview()
 
+    def _nearest_point(self, ev):
+        # Index of the control point closest to the click (within hit_radius), or None
+        cxy = self.app._to_canvas_batch(self.points)  # All points to canvas space in one transform
+        d2 = ((cxy - (ev.x, ev.y)) ** 2).sum(axis=1)
+        best = int(np.argmin(d2))
+        if d2[best] > self.hit_radius**2:
+            return None
+        return best
+
     def on_canvas_double_click(self, ev):
         # Handle double-click to remove all connections for a control point
-        if not self.points:
+        if len(self.points) == 0:
             return
         imgxy = self.app._from_canvas(ev.x, ev.y)
         if imgxy is None:
             return
-        best = None; bestd2 = 1e9
-        for i,(x,y) in enumerate(self.points):
-            cx, cy = self.app._to_canvas(x,y)
-            d2 = (cx-ev.x)**2 + (cy-ev.y)**2
-            if d2 < bestd2:
-                bestd2 = d2; best = i
-        if best is None or bestd2 > (self.hit_radius**2):
+        best = self._nearest_point(ev)
+        if best is None:
             return
-        self.pairs = [p for p in self.pairs if (best not in p)]
+        self.pairs = tuple(p for p in self.pairs if (best not in p))
         if self.selected == best:
             self.selected = None
         self.app.update_preview()
\ No newline at end of file
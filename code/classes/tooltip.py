@@ -5,7 +5,8 @@ class ToolTip:
         # Initialize tooltip for a widget
         self.widget = widget            # Target widget for tooltip
         self.text = text                # Tooltip text to display
-        self.tip_window = None          # Toplevel window for tooltip (None when hidden)
+        self.tip_window = None          # Toplevel window for tooltip (created on first show, then reused)
+        self.visible = False            # Whether the tooltip window is currently mapped
         self.after_id = None            # ID for scheduled tooltip display
         self.delay_ms = delay_ms        # Delay before showing tooltip (ms)
 
@@ -27,11 +28,16 @@ class ToolTip:
 
     def _show(self):
         # Display tooltip window at widget's position
-        if self.tip_window or not self.text:
+        if self.visible or not self.text:
             return  # Skip if already shown or no text
         # Position tooltip below and slightly right of widget
         x = self.widget.winfo_rootx() + 12
         y = self.widget.winfo_rooty() + self.widget.winfo_height() + 6
+        self.visible = True
+        if self.tip_window is not None:
+            self.tip_window.wm_geometry(f"+{x}+{y}")  # Reuse the window and label built on first show
+            self.tip_window.deiconify()
+            return
         self.tip_window = tw = tk.Toplevel(self.widget)
         tw.wm_overrideredirect(True)  # Remove window decorations
         tw.wm_geometry(f"+{x}+{y}")   # Set position
@@ -50,8 +56,8 @@ class ToolTip:
         label.pack()
 
     def _hide(self, _=None):
-        # Hide and destroy tooltip window
+        # Hide tooltip window (withdrawn, kept for the next hover)
         self._cancel()  # Cancel any scheduled display
-        if self.tip_window:
-            self.tip_window.destroy()
-            self.tip_window = None
\ No newline at end of file
+        if self.visible:
+            self.tip_window.withdraw()
+            self.visible = False
\ No newline at end of file
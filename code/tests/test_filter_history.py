@@ -0,0 +1,101 @@
+# Undo/redo of the filter sliders, driven through the same variable traces the UI installs.
+# Runs headless: the Tk variables live on a bare Tcl interpreter, no window is created.
+
+import os
+import sys
+import unittest
+import tkinter as tk
+from collections import deque
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from classes.map_enhancer_wizard import MapEnhancerWizard, FilterState, HISTORY_SIZE
+
+
+class HeadlessWizard(MapEnhancerWizard):
+    def __init__(self, interp):
+        # Only the state the slider/history code touches; after() jobs are queued for the test to run
+        self.threshold_var = tk.DoubleVar(interp, value=0.5)
+        self.use_adaptive = tk.BooleanVar(interp, value=False)
+        self.blur_var = tk.IntVar(interp, value=0)
+        self.median_var = tk.IntVar(interp, value=0)
+        self.opening_var = tk.IntVar(interp, value=0)
+        self.closing_var = tk.IntVar(interp, value=0)
+        self.dilation_var = tk.IntVar(interp, value=0)
+        self.erosion_var = tk.IntVar(interp, value=0)
+        self.history = deque(maxlen=HISTORY_SIZE)
+        self.future = deque(maxlen=HISTORY_SIZE)
+        self._scale_after_id = None
+        self._pending_scale_cb = None
+        self._clamping_scale = False
+        self._restoring = False
+        self._scale_values = {}
+        self.jobs = {}
+        self.previews = 0
+        label = type("Label", (), {"configure": lambda self, **kw: None})()
+        for var in (self.threshold_var, self.blur_var, self.median_var, self.opening_var,
+                    self.closing_var, self.dilation_var, self.erosion_var):
+            var.trace_add("write", lambda *_, v=var: self._on_scale_change(v, label, self.update_preview))
+        self._push_history_snapshot()
+
+    def after(self, ms, func):
+        job = f"after#{len(self.jobs)}"
+        self.jobs[job] = func
+        return job
+
+    def after_cancel(self, job):
+        self.jobs.pop(job, None)
+
+    def run_jobs(self):
+        jobs, self.jobs = self.jobs, {}
+        for func in jobs.values():
+            func()
+
+    def update_preview(self):
+        self.previews += 1
+
+    def drag(self, var, value):
+        var.set(value)
+        self.run_jobs()
+
+
+class FilterHistoryTest(unittest.TestCase):
+    def setUp(self):
+        self.app = HeadlessWizard(tk.Tcl())
+
+    def test_undo_then_redo_round_trips(self):
+        app = self.app
+        app.drag(app.erosion_var, 3)
+        app.drag(app.dilation_var, 2)
+        after_drags = app._snapshot()
+        app.undo()
+        self.assertEqual(app._snapshot(), FilterState(0.5, False, 0, 0, 0, 0, 0, 3))
+        self.assertEqual(app.jobs, {})  # Restoring schedules no deferred refilter
+        app.run_jobs()
+        app.redo()
+        app.run_jobs()
+        self.assertEqual(app._snapshot(), after_drags)
+        self.assertEqual(len(app.future), 0)
+        self.assertEqual(app.history[-1], after_drags)
+        app.undo()
+        app.undo()
+        app.run_jobs()
+        self.assertEqual(app._snapshot(), FilterState(0.5, False, 0, 0, 0, 0, 0, 0))
+        self.assertEqual(len(app.future), 2)  # Redo stack survives the restores
+        app.redo()
+        app.redo()
+        self.assertEqual(app._snapshot(), after_drags)
+
+    def test_reset_refreshes_once(self):
+        app = self.app
+        app.drag(app.median_var, 5)
+        app.previews = 0
+        app._status = lambda msg: None
+        app.reset_filters()
+        app.run_jobs()
+        self.assertEqual(app.previews, 1)
+        self.assertEqual(app.history[-1], FilterState(0.5, False, 0, 0, 0, 0, 0, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,10 +1,13 @@
 import cv2
 from PIL import Image, ImageTk
 
-def cv_to_photo(img):
-    # Convert OpenCV image (grayscale or BGR) to PhotoImage
-    if img.ndim == 2:
-        pil = Image.fromarray(img)  # Grayscale image
+def cv_to_photo(img, photo=None, rgb=False):
+    # Convert OpenCV image (grayscale, BGR, or RGB when rgb=True) to PhotoImage
+    if img.ndim == 2 or rgb:
+        pil = Image.fromarray(img)  # Grayscale/RGB image (wraps the array buffer, no copy)
     else:
         pil = Image.fromarray(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))  # Convert BGR to RGB
-    return ImageTk.PhotoImage(pil)  # Return Tkinter-compatible image
\ No newline at end of file
+    if photo is not None:
+        photo.paste(pil)  # Reuse existing PhotoImage (caller guarantees same size and channels)
+        return photo
+    return ImageTk.PhotoImage(pil)  # Return Tkinter-compatible image
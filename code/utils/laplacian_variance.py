@@ -0,0 +1,15 @@
+import numpy as np
+
+def laplacian_variance(img, max_rows=512):
+    # Variance of the 3x3 Laplacian (as cv2.Laplacian, ksize=1) over at most max_rows evenly spaced rows
+    h, w = img.shape[:2]
+    if h < 2 or w < 2:
+        return 0.0
+    step = max(1, -(-h // max_rows))  # Ceil division keeps the sample within max_rows
+    rows = np.arange(0, h, step)
+    up = np.abs(rows - 1)                      # Reflect-101 border, like OpenCV's default
+    down = (h - 1) - np.abs((h - 1) - (rows + 1))
+    center = np.pad(img[rows].astype(np.int16), ((0, 0), (1, 1)), mode="reflect")
+    lap = (img[up].astype(np.int16) + img[down] + center[:, :-2] + center[:, 2:]
+           - 4 * center[:, 1:-1])  # int16 is enough: |lap| <= 4 * 255
+    return float(lap.var())
@@ -0,0 +1,16 @@
+import cv2
+import numpy as np
+import yaml
+
+# libyaml-backed loader when PyYAML was built with it, pure-Python otherwise
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+def load_map_files(pgm_file, yaml_file):
+    # Read map metadata and grayscale PGM; safe to call off the Tk thread
+    with open(yaml_file, "r") as fd:
+        meta = yaml.load(fd, Loader=_YAML_LOADER) or {}
+    if not isinstance(meta, dict):
+        meta = {}
+    raw = np.fromfile(pgm_file, dtype=np.uint8)  # One bulk read, decoded from memory
+    img = cv2.imdecode(raw, cv2.IMREAD_GRAYSCALE) if raw.size else None
+    return img, meta
@@ -1,4 +1,5 @@
 import cv2
+from functools import lru_cache
 from utils.clamp import clamp
 
 def morphological_kernel(size):
@@ -6,4 +7,11 @@ def morphological_kernel(size):
     size = clamp(int(size), 1, 99)  # Ensure size is within valid range
     if size % 2 == 0:
         size += 1  # Force odd size for symmetry
-    return cv2.getStructuringElement(cv2.MORPH_RECT, (size, size))
\ No newline at end of file
+    return _rect_kernel(size)
+
+@lru_cache(maxsize=64)
+def _rect_kernel(size):
+    # Build (once per size) a shared, read-only rectangular structuring element
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (size, size))
+    kernel.setflags(write=False)  # Shared across callers, must never be mutated
+    return kernel
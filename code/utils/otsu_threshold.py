@@ -0,0 +1,24 @@
+import numpy as np
+
+def otsu_threshold(hist):
+    # Return the Otsu threshold (0..255) of a 256-bin histogram, matching cv2.THRESH_OTSU
+    p = np.asarray(hist, dtype=np.float64).ravel()
+    total = p.sum()
+    if total <= 0:
+        return 0
+    p = p / total
+    levels = np.arange(p.size, dtype=np.float64)
+    q1 = np.cumsum(p)                     # Weight of the class at or below each candidate threshold
+    q2 = 1.0 - q1                         # Weight of the class above it
+    cum_mu = np.cumsum(levels * p)
+    mu = cum_mu[-1]
+    eps = np.finfo(np.float32).eps
+    valid = (np.minimum(q1, q2) >= eps) & (np.maximum(q1, q2) <= 1.0 - eps)
+    if not valid.any():
+        return 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mu1 = cum_mu / q1
+        mu2 = (mu - cum_mu) / q2
+        sigma_b = q1 * q2 * (mu1 - mu2) ** 2  # Between-class variance for every threshold at once
+    sigma_b[~valid] = 0.0
+    return int(np.argmax(sigma_b))